@@ -3,14 +3,54 @@ from __future__ import annotations
 import os
 from typing import Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import DateTime, create_engine, event, inspect, text
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./music.db")
 
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-engine = create_engine(DATABASE_URL, connect_args=connect_args, future=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+if DATABASE_URL.startswith("sqlite"):
+    # Share a single connection instead of reopening the file per checkout.
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        query_cache_size=1200,
+        future=True,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+        # WAL lets broadcast reads proceed concurrently with playback writes,
+        # which is the dominant contention in this app on SQLite.
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+else:
+    engine = create_engine(
+        DATABASE_URL,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "25")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "25")),
+        pool_pre_ping=True,
+        pool_recycle=1800,
+        query_cache_size=1200,
+        future=True,
+    )
+# expire_on_commit=False keeps attributes usable after commit instead of
+# expiring everything and re-SELECTing on next access; handlers that commit
+# mid-request then serialize the same rows skip a full reload. Mutation
+# helpers that bypass the unit of work expire just what they staled.
+SessionLocal = sessionmaker(
+    bind=engine,
+    autoflush=False,
+    autocommit=False,
+    expire_on_commit=False,
+    future=True,
+)
 
 Base = declarative_base()
 
@@ -23,7 +63,46 @@ def get_db() -> Generator:
         db.close()
 
 
+def _upgrade_schema() -> None:
+    """Bring a pre-existing database up to the current sessions schema.
+
+    create_all only creates missing tables — it never ALTERs existing
+    ones — so the columns this schema added (playlist_version) or retyped
+    (playback_updated_at, DateTime -> epoch Float) are patched in place
+    here for databases initialized before the change."""
+    inspector = inspect(engine)
+    if not inspector.has_table("sessions"):
+        return
+    columns = {column["name"]: column for column in inspector.get_columns("sessions")}
+    with engine.begin() as conn:
+        if "playlist_version" not in columns:
+            conn.execute(text("ALTER TABLE sessions ADD COLUMN playlist_version INTEGER NOT NULL DEFAULT 0"))
+        stamp = columns.get("playback_updated_at")
+        if stamp is None:
+            conn.execute(text("ALTER TABLE sessions ADD COLUMN playback_updated_at FLOAT NOT NULL DEFAULT 0"))
+        elif isinstance(stamp["type"], DateTime):
+            if engine.dialect.name == "sqlite":
+                # SQLite cannot retype a column, but its affinity rules store
+                # numeric values fine; rewrite the old text timestamps to
+                # epoch seconds so serialization never sees a datetime.
+                conn.execute(
+                    text(
+                        "UPDATE sessions SET playback_updated_at = "
+                        "CAST(strftime('%s', playback_updated_at) AS REAL) "
+                        "WHERE typeof(playback_updated_at) = 'text'"
+                    )
+                )
+            else:
+                conn.execute(
+                    text(
+                        "ALTER TABLE sessions ALTER COLUMN playback_updated_at "
+                        "TYPE double precision USING extract(epoch FROM playback_updated_at)"
+                    )
+                )
+
+
 def init_db() -> None:
     from . import models  # noqa: F401 - ensure models are registered
 
     Base.metadata.create_all(bind=engine)
+    _upgrade_schema()
@@ -1,15 +1,18 @@
 from __future__ import annotations
 
 import asyncio
-import base64
+import binascii
 import json
-import shutil
-from datetime import datetime, timezone
+import os
+from functools import lru_cache
+import time
 from pathlib import Path
 from typing import Dict, List, Optional
 from uuid import uuid4
 
-from fastapi import Depends, FastAPI, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
+import aiofiles
+import anyio
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, UploadFile, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
@@ -19,17 +22,28 @@ try:  # pragma: no cover - optional dependency
     from mutagen import File as MutagenFile
 except Exception:  # pragma: no cover - fall back to hints
     MutagenFile = None
+
+try:  # pragma: no cover - optional dependency
+    import orjson
+except Exception:  # pragma: no cover - fall back to stdlib json
+    orjson = None
+
+try:  # pragma: no cover - optional dependency
+    import redis.asyncio as aioredis
+except Exception:  # pragma: no cover - single-worker fan-out without redis
+    aioredis = None
+from sqlalchemy import and_, lambda_stmt, or_, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from .database import SessionLocal, get_db, init_db
-from .models import CollabSession, PlaylistRequestEntry, User
+from .database import SessionLocal, engine, get_db, init_db
+from .models import CollabSession, PlaylistItem, PlaylistRequestEntry, User
 from .schemas import (
     CustomPlaylistRequest,
     JoinSessionRequest,
     JoinSessionResponse,
     LoginRequest,
     LoginResponse,
-    MessageEnvelope,
     PlaybackCommand,
     PlaybackStateModel,
     PlaylistMutationRequest,
@@ -49,14 +63,23 @@ from .services import (
     ensure_session,
     ensure_session_membership,
     generate_code,
+    get_request_entry,
+    persist_playback_state,
     remove_playlist_item,
     reorder_playlist,
     serialize_playback,
     serialize_playlist,
-    update_playback_state,
+    serialize_request,
 )
 
-init_db()
+if orjson is not None:
+    json_dumps = orjson.dumps
+    json_loads = orjson.loads
+else:
+    def json_dumps(message: Dict) -> bytes:
+        return json.dumps(message).encode()
+
+    json_loads = json.loads
 
 BASE_DIR = Path(__file__).resolve().parent
 UPLOAD_DIR = BASE_DIR / "static" / "uploads"
@@ -68,8 +91,26 @@ ALLOWED_MEDIA_TYPES = {
     "audio/mp4": ".mp4",
 }
 ALLOWED_MEDIA_EXTENSIONS = {".mp3", ".mp4"}
+UPLOAD_CHUNK_SIZE = 1 << 20
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+REDIS_URL = os.getenv("REDIS_URL")
+SESSION_CODE_ATTEMPTS = 3
+
+if orjson is not None:
+    from fastapi.responses import ORJSONResponse
+
+    app = FastAPI(title="Collaborative Music Player", default_response_class=ORJSONResponse)
+else:
+    app = FastAPI(title="Collaborative Music Player")
+
+
+@app.on_event("startup")
+def on_startup() -> None:
+    # Run schema creation once per process instead of at import time, so
+    # uvicorn reloads and multiple workers don't race on CREATE TABLE.
+    init_db()
+
 
-app = FastAPI(title="Collaborative Music Player")
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -84,34 +125,218 @@ if static_dir.exists():
     app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
 
 
+BROADCAST_SEND_TIMEOUT = 5.0
+
+
 class ConnectionManager:
     def __init__(self) -> None:
-        self.active: Dict[str, List[WebSocket]] = {}
-        self.lock = asyncio.Lock()
+        # Copy-on-write tuples replaced atomically between awaits; the event
+        # loop is single-threaded, so no lock is needed anywhere.
+        self.active: Dict[str, tuple[WebSocket, ...]] = {}
 
     async def connect(self, session_id: str, websocket: WebSocket) -> None:
         await websocket.accept()
-        async with self.lock:
-            self.active.setdefault(session_id, []).append(websocket)
-
-    async def disconnect(self, session_id: str, websocket: WebSocket) -> None:
-        async with self.lock:
-            if session_id in self.active and websocket in self.active[session_id]:
-                self.active[session_id].remove(websocket)
-
-    async def broadcast(self, session_id: str, message: Dict) -> None:
-        payload = json.dumps(message)
-        async with self.lock:
-            targets = list(self.active.get(session_id, []))
-        for websocket in targets:
-            try:
-                await websocket.send_text(payload)
-            except RuntimeError:
-                pass
+        self.active[session_id] = self.active.get(session_id, ()) + (websocket,)
+
+    def forget(self, session_id: str, websocket: WebSocket) -> None:
+        remaining = tuple(
+            ws for ws in self.active.get(session_id, ()) if ws is not websocket
+        )
+        if remaining:
+            self.active[session_id] = remaining
+        else:
+            self.active.pop(session_id, None)
+
+    async def _safe_send(self, websocket: WebSocket, payload: bytes) -> bool:
+        try:
+            await asyncio.wait_for(websocket.send_bytes(payload), timeout=BROADCAST_SEND_TIMEOUT)
+        except (RuntimeError, WebSocketDisconnect, asyncio.TimeoutError):
+            return False
+        return True
+
+    async def broadcast_bytes(self, session_id: str, payload: bytes) -> None:
+        # With a relay every worker receives the payload back over pub/sub
+        # and delivers to its own sockets, so a session spread across
+        # workers still sees every message exactly once.
+        if redis_relay is not None:
+            await redis_relay.publish(session_id, payload)
+            return
+        await self.deliver_local(session_id, payload)
+
+    async def deliver_local(self, session_id: str, payload: bytes) -> None:
+        targets = self.active.get(session_id, ())
+        if not targets:
+            return
+        results = await asyncio.gather(
+            *(self._safe_send(websocket, payload) for websocket in targets), return_exceptions=True
+        )
+        # Prune failed sockets only after the gather so self.active is never
+        # mutated while sends are in flight.
+        for websocket, delivered in zip(targets, results):
+            if delivered is not True:
+                self.forget(session_id, websocket)
 
 
 manager = ConnectionManager()
 
+# The envelope shape is fixed, so broadcasts splice pre-encoded framing
+# around the encoded payload instead of building and walking a wrapper dict
+# per message.
+_ENVELOPE_CLOSE = b"}"
+_PLAYLIST_PREFIX = b'{"type":"playlist_update","payload":'
+_PLAYBACK_PREFIX = b'{"type":"playback_state","payload":'
+_REQUEST_PREFIX = b'{"type":"request_update","payload":'
+
+
+def playback_envelope(payload: Dict) -> bytes:
+    return _PLAYBACK_PREFIX + json_dumps(payload) + _ENVELOPE_CLOSE
+
+
+class RedisRelay:
+    """Cross-worker WebSocket fan-out over Redis pub/sub.
+
+    Publishes encoded envelopes to a per-session channel; a background
+    listener task hands every published payload to the local
+    ConnectionManager. Enabled only when REDIS_URL is set and the redis
+    package is installed; otherwise fan-out stays in-process."""
+
+    CHANNEL_PREFIX = "session:"
+
+    def __init__(self, url: str) -> None:
+        self.client = aioredis.from_url(url)
+        self.pubsub = self.client.pubsub()
+        self.task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        await self.pubsub.psubscribe(f"{self.CHANNEL_PREFIX}*")
+        self.task = asyncio.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        async for message in self.pubsub.listen():
+            if message.get("type") != "pmessage":
+                continue
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            session_id = channel[len(self.CHANNEL_PREFIX):]
+            await manager.deliver_local(session_id, message["data"])
+
+    async def publish(self, session_id: str, payload: bytes) -> None:
+        await self.client.publish(f"{self.CHANNEL_PREFIX}{session_id}", payload)
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+
+redis_relay: Optional[RedisRelay] = None
+
+
+@app.on_event("startup")
+async def start_redis_relay() -> None:
+    global redis_relay
+    if REDIS_URL and aioredis is not None:
+        redis_relay = RedisRelay(REDIS_URL)
+        await redis_relay.start()
+
+
+@app.on_event("shutdown")
+async def stop_redis_relay() -> None:
+    global redis_relay
+    if redis_relay is not None:
+        await redis_relay.stop()
+        redis_relay = None
+
+# Entries are never invalidated individually (version mismatches just
+# rebuild), so without a cap the per-session caches below would grow for
+# every session ever touched. Same wholesale-clear policy as the token
+# cache: rare, and the next broadcast repopulates only live sessions.
+SESSION_CACHE_MAX_ENTRIES = 1024
+
+# session id -> (playlist_version, encoded envelope). The version column is
+# bumped by every playlist mutation, so a matching entry means the cached
+# bytes are current and broadcasts skip both ORM traversal and re-encoding.
+_playlist_cache: Dict[str, tuple[int, bytes]] = {}
+
+
+# session id -> (playlist_version, track ids in position order). Shares the
+# version key with the byte cache above so skips resolve in memory.
+_track_order_cache: Dict[str, tuple[int, List[str]]] = {}
+
+
+def track_order(db: Session, session: CollabSession) -> List[str]:
+    version = session.playlist_version or 0
+    cached = _track_order_cache.get(session.id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    order = db.execute(
+        select(PlaylistItem.track_id)
+        .where(PlaylistItem.session_id == session.id)
+        .order_by(PlaylistItem.position)
+    ).scalars().all()
+    if len(_track_order_cache) >= SESSION_CACHE_MAX_ENTRIES:
+        _track_order_cache.clear()
+    _track_order_cache[session.id] = (version, order)
+    return order
+
+
+def playlist_payload(session: CollabSession) -> bytes:
+    version = session.playlist_version or 0
+    cached = _playlist_cache.get(session.id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    payload = (
+        _PLAYLIST_PREFIX
+        + json_dumps({"playlist": serialize_playlist(session)})
+        + _ENVELOPE_CLOSE
+    )
+    if len(_playlist_cache) >= SESSION_CACHE_MAX_ENTRIES:
+        _playlist_cache.clear()
+    _playlist_cache[session.id] = (version, payload)
+    return payload
+
+
+PLAYBACK_FLUSH_INTERVAL = 0.1
+
+
+class PlaybackCoalescer:
+    """Debounces playback-command writes so seek-bar scrubbing costs one
+    commit and one broadcast per interval instead of one per frame."""
+
+    def __init__(self) -> None:
+        self.pending: Dict[str, Dict] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+
+    def schedule(self, session_id: str, state_update: Dict) -> None:
+        self.pending.setdefault(session_id, {}).update(state_update)
+        if session_id not in self.tasks:
+            self.tasks[session_id] = asyncio.create_task(self._flush_later(session_id))
+
+    async def _flush_later(self, session_id: str) -> None:
+        try:
+            await asyncio.sleep(PLAYBACK_FLUSH_INTERVAL)
+        finally:
+            self.tasks.pop(session_id, None)
+        state_update = self.pending.pop(session_id, None)
+        if not state_update:
+            return
+        # Commit and close before awaiting the broadcast: holding a session
+        # open across an await lets another coroutine's transaction interleave
+        # on SQLite's shared connection.
+        def _flush() -> Optional[Dict]:
+            with SessionLocal() as db:
+                return persist_playback_state(db, session_id, state_update)
+
+        payload = await run_db(_flush)
+        if payload is None:
+            return
+        await manager.broadcast_bytes(session_id, playback_envelope(payload))
+
+
+playback_coalescer = PlaybackCoalescer()
+
 
 def resolve_media_extension(filename: str, content_type: str | None) -> str:
     content_type = (content_type or "").lower()
@@ -123,20 +348,71 @@ def resolve_media_extension(filename: str, content_type: str | None) -> str:
     raise HTTPException(status_code=415, detail="Only MP3 or MP4 uploads are supported")
 
 
-def persist_media_bytes(content: bytes, extension: str) -> tuple[str, Path]:
+BASE64_CHUNK_CHARS = 48 * 1024  # multiple of 4: each slice decodes standalone
+
+
+async def persist_base64_media(encoded: str, extension: str) -> tuple[str, Path]:
+    # Decode in slices straight to disk so the full decoded blob (and its
+    # 1.33x encoded twin) are never resident together.
+    if "\n" in encoded or "\r" in encoded or " " in encoded:
+        encoded = "".join(encoded.split())
     filename = f"{uuid4().hex}{extension}"
     destination = UPLOAD_DIR / filename
-    with destination.open("wb") as buffer:
-        buffer.write(content)
+    try:
+        async with aiofiles.open(destination, "wb") as buffer:
+            for start in range(0, len(encoded), BASE64_CHUNK_CHARS):
+                await buffer.write(binascii.a2b_base64(encoded[start : start + BASE64_CHUNK_CHARS]))
+    except (binascii.Error, ValueError) as exc:
+        destination.unlink(missing_ok=True)
+        raise HTTPException(status_code=422, detail="media payload is not valid base64") from exc
     relative_path = f"uploads/{filename}"
     return relative_path, destination
 
 
-def detect_duration_seconds(file_path: Path) -> Optional[int]:
-    if MutagenFile is None:
+async def stream_media_to_disk(upload: UploadFile, extension: str) -> tuple[str, Path]:
+    filename = f"{uuid4().hex}{extension}"
+    destination = UPLOAD_DIR / filename
+    written = 0
+    async with aiofiles.open(destination, "wb") as buffer:
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            written += len(chunk)
+            if written > MAX_UPLOAD_BYTES:
+                destination.unlink(missing_ok=True)
+                raise HTTPException(status_code=413, detail="upload exceeds the configured size limit")
+            await buffer.write(chunk)
+    relative_path = f"uploads/{filename}"
+    return relative_path, destination
+
+
+def enforce_upload_size(request: Request) -> None:
+    # A declared length is mandatory: chunked bodies would otherwise be
+    # buffered in full by request.body()/request.form() before the
+    # per-chunk cap in stream_media_to_disk ever runs.
+    content_length = request.headers.get("content-length")
+    if not content_length:
+        raise HTTPException(status_code=411, detail="Content-Length is required for uploads")
+    try:
+        declared = int(content_length)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="invalid Content-Length header") from exc
+    if declared > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="upload exceeds the configured size limit")
+
+
+def parse_duration_hint(raw: object) -> Optional[int]:
+    if raw in (None, ""):
         return None
     try:
-        media_file = MutagenFile(file_path)
+        return max(0, int(raw))
+    except (TypeError, ValueError) as exc:
+        raise HTTPException(status_code=422, detail="duration_seconds must be a positive integer") from exc
+
+
+@lru_cache(maxsize=1024)
+def _mutagen_length(path: str, size: int, mtime_ns: int) -> Optional[int]:
+    # size/mtime key the cache so a rewritten file re-parses.
+    try:
+        media_file = MutagenFile(path)
     except Exception:
         return None
     if not media_file or not getattr(media_file, "info", None):
@@ -147,162 +423,314 @@ def detect_duration_seconds(file_path: Path) -> Optional[int]:
     return max(0, int(length))
 
 
+def detect_duration_seconds(file_path: Path) -> Optional[int]:
+    if MutagenFile is None:
+        return None
+    try:
+        stat = file_path.stat()
+    except OSError:
+        return None
+    return _mutagen_length(str(file_path), stat.st_size, stat.st_mtime_ns)
+
+
+async def store_playlist_media(
+    db: Session,
+    session: CollabSession,
+    track_id: str,
+    name: str,
+    media_path: str,
+    destination: Path,
+    media_type: Optional[str],
+    duration_hint: Optional[int],
+):
+    # Mutagen parses the container synchronously; keep it off the event loop.
+    detected_duration = await asyncio.to_thread(detect_duration_seconds, destination)
+    duration_seconds = detected_duration or duration_hint
+    if session.max_media_duration_seconds is not None:
+        if duration_seconds is None:
+            raise HTTPException(status_code=422, detail="Unable to determine media duration for enforcement")
+        if duration_seconds > session.max_media_duration_seconds:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Track is longer than the allowed {session.max_media_duration_seconds} seconds",
+            )
+    return await run_db(
+        add_playlist_item,
+        db,
+        session,
+        track_id,
+        name,
+        media_path,
+        media_type,
+        duration_seconds,
+    )
+
+
+def select_user_by_token(db: Session, token: str) -> Optional[User]:
+    # lambda_stmt guarantees compiled-SQL cache hits for this hottest lookup.
+    stmt = lambda_stmt(lambda: select(User).where(User.token == token))
+    return db.execute(stmt).scalar_one_or_none()
+
+
+# Worker-thread cap for offloaded DB calls, so a request burst widens the
+# connection pool rather than the process thread count.
+DB_THREAD_LIMIT = int(os.getenv("DB_THREAD_LIMIT", "25"))
+
+_db_inline = engine.dialect.name == "sqlite"
+_db_limiter = anyio.CapacityLimiter(DB_THREAD_LIMIT)
+
+
+async def run_db(fn, *args):
+    """Run blocking session work without stalling the event loop.
+
+    SQLite runs through one shared StaticPool connection where local calls
+    are microseconds and cross-thread transaction interleaving is unsafe,
+    so work stays inline there; networked databases have real I/O waits
+    and are offloaded to a capped worker thread."""
+    if _db_inline:
+        return fn(*args)
+    return await anyio.to_thread.run_sync(fn, *args, limiter=_db_limiter)
+
+
+async def get_membership(
+    session_id: str,
+    token: Optional[str] = Header(default=None, alias="X-User-Token"),
+    db: Session = Depends(get_db),
+) -> tuple[User, CollabSession]:
+    """Resolve actor and session membership in a single joined query."""
+    if not token:
+        raise HTTPException(status_code=401, detail="missing token")
+    stmt = lambda_stmt(
+        lambda: select(User, CollabSession)
+        .join(
+            CollabSession,
+            or_(
+                and_(User.role == "host", CollabSession.host_id == User.id),
+                and_(User.role == "guest", User.session_id == CollabSession.id),
+            ),
+        )
+        .where(User.token == token, CollabSession.id == session_id)
+    )
+    row = await run_db(lambda: db.execute(stmt).first())
+    if row is not None:
+        return row[0], row[1]
+    # Rare miss: re-run the two-step checks so callers get the precise
+    # 401/403/404 the split dependencies used to raise.
+    actor = await run_db(select_user_by_token, db, token)
+    if not actor:
+        raise HTTPException(status_code=401, detail="invalid token")
+    await run_db(ensure_session, db, session_id)
+    raise HTTPException(status_code=403, detail="not a member of this session")
+
+
+TOKEN_CACHE_TTL = 30.0
+TOKEN_CACHE_MAX_ENTRIES = 4096
+
+# token -> (user_id, role, user_session_id, expiry). Lets repeat requests and
+# WebSocket handshakes resolve the actor without a token scan.
+_token_cache: Dict[str, tuple[str, str, Optional[str], float]] = {}
+
+
+def _cache_token(token: str, actor: User, now: float) -> None:
+    if len(_token_cache) >= TOKEN_CACHE_MAX_ENTRIES:
+        _token_cache.clear()
+    _token_cache[token] = (actor.id, actor.role, actor.session_id, now + TOKEN_CACHE_TTL)
+
+
+def lookup_token(db: Session, token: str) -> Optional[tuple[str, str, Optional[str]]]:
+    """Resolve token -> (user_id, role, user_session_id) via the cache."""
+    now = time.monotonic()
+    cached = _token_cache.get(token)
+    if cached and cached[3] > now:
+        return cached[0], cached[1], cached[2]
+    actor = select_user_by_token(db, token)
+    if not actor:
+        _token_cache.pop(token, None)
+        return None
+    _cache_token(token, actor, now)
+    return actor.id, actor.role, actor.session_id
+
+
 async def get_actor(
     token: Optional[str] = Header(default=None, alias="X-User-Token"),
     db: Session = Depends(get_db),
 ) -> User:
     if not token:
         raise HTTPException(status_code=401, detail="missing token")
-    actor = db.query(User).filter(User.token == token).one_or_none()
+    now = time.monotonic()
+    cached = _token_cache.get(token)
+    if cached and cached[3] > now:
+        actor = await run_db(db.get, User, cached[0])
+        if actor is not None and actor.token == token:
+            return actor
+    actor = await run_db(select_user_by_token, db, token)
     if not actor:
+        _token_cache.pop(token, None)
         raise HTTPException(status_code=401, detail="invalid token")
+    _cache_token(token, actor, now)
     return actor
 
 
 async def broadcast_playlist(session: CollabSession) -> None:
-    await manager.broadcast(
-        session.id,
-        MessageEnvelope(type="playlist_update", payload={"playlist": serialize_playlist(session)}).model_dump(),
-    )
+    # Outbound envelopes are server-built and already trusted; skip Pydantic.
+    await manager.broadcast_bytes(session.id, playlist_payload(session))
 
 
 async def broadcast_request_update(entry: PlaylistRequestEntry) -> None:
-    await manager.broadcast(
-        entry.session_id,
-        MessageEnvelope(type="request_update", payload=build_request_model(entry).model_dump()).model_dump(),
-    )
-
-
-async def broadcast_playback(session: CollabSession) -> None:
-    await manager.broadcast(
-        session.id,
-        MessageEnvelope(type="playback_state", payload=serialize_playback(session)).model_dump(),
+    await manager.broadcast_bytes(
+        entry.session_id, _REQUEST_PREFIX + json_dumps(serialize_request(entry)) + _ENVELOPE_CLOSE
     )
 
 
 @app.get("/", response_class=HTMLResponse)
-def dashboard(request: Request) -> HTMLResponse:
+async def dashboard(request: Request) -> HTMLResponse:
     return templates.TemplateResponse("dashboard.html", {"request": request})
 
 
 @app.post("/auth/login", response_model=LoginResponse)
-def login(payload: LoginRequest, db: Session = Depends(get_db)) -> LoginResponse:
+async def login(payload: LoginRequest, db: Session = Depends(get_db)) -> LoginResponse:
     token = create_token()
     user = User(name=payload.name, role=payload.role, token=token)
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return LoginResponse(token=user.token, user_id=user.id, role=user.role)
+
+    def _persist() -> str:
+        db.add(user)
+        # Flush assigns the id; capture it for the response instead of
+        # refreshing with another SELECT after the commit.
+        db.flush()
+        user_id = user.id
+        db.commit()
+        return user_id
+
+    user_id = await run_db(_persist)
+    return LoginResponse(token=token, user_id=user_id, role=payload.role)
 
 
 @app.post("/sessions", response_model=SessionResponse)
-def create_session(payload: SessionCreateRequest, actor: User = Depends(get_actor), db: Session = Depends(get_db)) -> SessionResponse:
+async def create_session(payload: SessionCreateRequest, actor: User = Depends(get_actor), db: Session = Depends(get_db)) -> SessionResponse:
     if actor.role != "host":
         raise HTTPException(status_code=403, detail="host token required")
-    actor.name = payload.host_name
-    session = CollabSession(
-        code=generate_code(db),
-        host_id=actor.id,
-        max_media_duration_seconds=payload.max_media_duration_seconds,
-    )
-    actor.session = session
-    db.add(session)
-    db.commit()
-    db.refresh(session)
-    db.refresh(actor)
-    return build_session_response(session, include_host_token=True)
+    for _ in range(SESSION_CODE_ATTEMPTS):
+        actor.name = payload.host_name
+        session = CollabSession(
+            code=generate_code(),
+            host_id=actor.id,
+            max_media_duration_seconds=payload.max_media_duration_seconds,
+        )
+        actor.session = session
+        db.add(session)
+        try:
+            await run_db(db.commit)
+        except IntegrityError:
+            # Code collision; the rollback expunges the failed session row
+            # and the next attempt draws a fresh code.
+            await run_db(db.rollback)
+            continue
+        # Attribute access after commit reloads lazily where needed; an
+        # explicit refresh of both rows would just issue two more SELECTs.
+        return build_session_response(session, include_host_token=True)
+    raise HTTPException(status_code=503, detail="could not allocate a session code")
 
 
 @app.post("/sessions/{code}/join", response_model=JoinSessionResponse)
-def join_session(code: str, payload: JoinSessionRequest, db: Session = Depends(get_db)) -> JoinSessionResponse:
-    session = db.query(CollabSession).filter(CollabSession.code == code).one_or_none()
-    if not session:
-        raise HTTPException(status_code=404, detail="session not found")
-    token = create_token()
-    guest = User(name=payload.guest_name, role="guest", token=token, session_id=session.id)
-    db.add(guest)
-    db.commit()
-    db.refresh(session)
-    return JoinSessionResponse(
-        session_id=session.id,
-        guest_token=guest.token,
-        max_media_duration_seconds=session.max_media_duration_seconds,
-        playlist=serialize_playlist(session),
-        playback_state=PlaybackStateModel(**serialize_playback(session)),
-    )
+async def join_session(code: str, payload: JoinSessionRequest, db: Session = Depends(get_db)) -> JoinSessionResponse:
+    stmt = lambda_stmt(lambda: select(CollabSession).where(CollabSession.code == code))
+
+    def _join() -> JoinSessionResponse:
+        session = db.execute(stmt).scalar_one_or_none()
+        if not session:
+            raise HTTPException(status_code=404, detail="session not found")
+        token = create_token()
+        guest = User(name=payload.guest_name, role="guest", token=token, session_id=session.id)
+        db.add(guest)
+        # Joining does not mutate the session row, so serialize it before
+        # the commit; refreshing afterwards would re-SELECT everything.
+        response = JoinSessionResponse(
+            session_id=session.id,
+            guest_token=token,
+            max_media_duration_seconds=session.max_media_duration_seconds,
+            playlist=serialize_playlist(session),
+            playback_state=PlaybackStateModel.model_construct(**serialize_playback(session)),
+        )
+        db.commit()
+        return response
+
+    return await run_db(_join)
 
 
-@app.get("/sessions/{session_id}/playlist", response_model=List[Dict])
-def get_playlist(session_id: str, actor: User = Depends(get_actor), db: Session = Depends(get_db)) -> List[Dict]:
-    session = ensure_session_membership(db, actor, session_id)
-    return serialize_playlist(session)
+@app.get("/sessions/{session_id}/playlist")
+async def get_playlist(member: tuple[User, CollabSession] = Depends(get_membership)) -> List[Dict]:
+    _, session = member
+    # Serialization lazy-loads the playlist collection on first access.
+    return await run_db(serialize_playlist, session)
 
 
-@app.post("/sessions/{session_id}/playlist", response_model=Dict)
+@app.post("/sessions/{session_id}/playlist")
 async def add_playlist_item_endpoint(
     session_id: str,
     request: Request,
-    actor: User = Depends(get_actor),
+    member: tuple[User, CollabSession] = Depends(get_membership),
     db: Session = Depends(get_db),
 ):
-    session = ensure_session_membership(db, actor, session_id)
+    actor, session = member
     if actor.role == "host":
-        try:
-            payload_data = await request.json()
-        except json.JSONDecodeError as exc:  # pragma: no cover - FastAPI already validates
-            raise HTTPException(status_code=400, detail="Invalid JSON payload") from exc
-        track_id = (payload_data.get("track_id") or "").strip()
-        name = (payload_data.get("name") or "").strip()
-        media_payload = payload_data.get("media") or {}
-        encoded_media = media_payload.get("data")
-        filename = media_payload.get("filename", "")
-        media_type = media_payload.get("content_type")
-        duration_hint = payload_data.get("duration_seconds")
-        if not track_id or not name or not encoded_media:
-            raise HTTPException(status_code=422, detail="track_id, name, and media data are required")
-        duration_hint_value: Optional[int] = None
-        if duration_hint not in (None, ""):
+        # Reject oversized bodies before buffering the payload.
+        enforce_upload_size(request)
+        content_type_header = (request.headers.get("content-type") or "").lower()
+        if content_type_header.startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=422, detail="media file is required")
+            track_id = (str(form.get("track_id") or "")).strip()
+            name = (str(form.get("name") or "")).strip()
+            if not track_id or not name:
+                raise HTTPException(status_code=422, detail="track_id and name are required")
+            duration_hint_value = parse_duration_hint(form.get("duration_seconds"))
+            extension = resolve_media_extension(upload.filename or "", upload.content_type)
+            media_type = upload.content_type or ("video/mp4" if extension == ".mp4" else "audio/mpeg")
+            destination: Optional[Path] = None
+            try:
+                media_path, destination = await stream_media_to_disk(upload, extension)
+                item = await store_playlist_media(
+                    db, session, track_id, name, media_path, destination, media_type, duration_hint_value
+                )
+            except HTTPException:
+                if destination and destination.exists():
+                    destination.unlink(missing_ok=True)
+                raise
+            except Exception as exc:
+                if destination and destination.exists():
+                    destination.unlink(missing_ok=True)
+                raise HTTPException(status_code=500, detail="Unable to store uploaded media") from exc
+        else:
             try:
-                duration_hint_value = max(0, int(duration_hint))
+                payload_data = json_loads(await request.body())
             except ValueError as exc:
-                raise HTTPException(status_code=422, detail="duration_seconds must be a positive integer") from exc
-        extension = resolve_media_extension(filename, media_type)
-        media_path = ""
-        destination: Optional[Path] = None
-        try:
+                raise HTTPException(status_code=400, detail="Invalid JSON payload") from exc
+            track_id = (payload_data.get("track_id") or "").strip()
+            name = (payload_data.get("name") or "").strip()
+            media_payload = payload_data.get("media") or {}
+            encoded_media = media_payload.get("data")
+            filename = media_payload.get("filename", "")
+            media_type = media_payload.get("content_type")
+            if not track_id or not name or not encoded_media:
+                raise HTTPException(status_code=422, detail="track_id, name, and media data are required")
+            duration_hint_value = parse_duration_hint(payload_data.get("duration_seconds"))
+            extension = resolve_media_extension(filename, media_type)
+            destination = None
             try:
-                binary = base64.b64decode(encoded_media)
+                media_path, destination = await persist_base64_media(encoded_media, extension)
+                item = await store_playlist_media(
+                    db, session, track_id, name, media_path, destination, media_type, duration_hint_value
+                )
+            except HTTPException:
+                if destination and destination.exists():
+                    destination.unlink(missing_ok=True)
+                raise
             except Exception as exc:
-                raise HTTPException(status_code=422, detail="media payload is not valid base64") from exc
-            media_path, destination = persist_media_bytes(binary, extension)
-            detected_duration = detect_duration_seconds(destination)
-            duration_seconds = detected_duration or duration_hint_value
-            if session.max_media_duration_seconds is not None:
-                if duration_seconds is None:
-                    raise HTTPException(status_code=422, detail="Unable to determine media duration for enforcement")
-                if duration_seconds > session.max_media_duration_seconds:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Track is longer than the allowed {session.max_media_duration_seconds} seconds",
-                    )
-            item = add_playlist_item(
-                db,
-                session,
-                track_id,
-                name,
-                media_path,
-                media_type,
-                duration_seconds,
-            )
-        except HTTPException:
-            if destination and destination.exists():
-                destination.unlink(missing_ok=True)
-            raise
-        except Exception as exc:
-            if destination and destination.exists():
-                destination.unlink(missing_ok=True)
-            raise HTTPException(status_code=500, detail="Unable to store uploaded media") from exc
-        db.refresh(session)
+                if destination and destination.exists():
+                    destination.unlink(missing_ok=True)
+                raise HTTPException(status_code=500, detail="Unable to store uploaded media") from exc
         await broadcast_playlist(session)
         return {
             "id": item.id,
@@ -315,59 +743,59 @@ async def add_playlist_item_endpoint(
         }
     payload_data = await request.json()
     payload = PlaylistMutationRequest(**payload_data)
-    request_entry = create_request(db, session, actor, "add", payload.model_dump(exclude_none=True))
+    request_entry = await run_db(create_request, db, session, actor, "add", payload.model_dump(exclude_none=True))
     await broadcast_request_update(request_entry)
-    return build_request_model(request_entry).model_dump()
+    return serialize_request(request_entry)
 
 
-@app.patch("/sessions/{session_id}/playlist/{item_id}", response_model=Dict)
+@app.patch("/sessions/{session_id}/playlist/{item_id}")
 async def reorder_playlist_endpoint(
     session_id: str,
     item_id: str,
     payload: PlaylistMutationRequest,
-    actor: User = Depends(get_actor),
+    member: tuple[User, CollabSession] = Depends(get_membership),
     db: Session = Depends(get_db),
 ):
-    session = ensure_session_membership(db, actor, session_id)
+    actor, session = member
     if payload.new_position is None:
         raise HTTPException(status_code=422, detail="new_position required")
     if actor.role == "host":
-        reorder_playlist(db, session, item_id, payload.new_position)
-        db.refresh(session)
+        await run_db(reorder_playlist, db, session, item_id, payload.new_position)
         await broadcast_playlist(session)
         return {"status": "updated"}
-    request = create_request(db, session, actor, "reorder", {"item_id": item_id, "new_position": payload.new_position})
+    request = await run_db(
+        create_request, db, session, actor, "reorder", {"item_id": item_id, "new_position": payload.new_position}
+    )
     await broadcast_request_update(request)
-    return build_request_model(request).model_dump()
+    return serialize_request(request)
 
 
-@app.delete("/sessions/{session_id}/playlist/{item_id}", response_model=Dict)
+@app.delete("/sessions/{session_id}/playlist/{item_id}")
 async def remove_playlist_item_endpoint(
     session_id: str,
     item_id: str,
-    actor: User = Depends(get_actor),
+    member: tuple[User, CollabSession] = Depends(get_membership),
     db: Session = Depends(get_db),
 ):
-    session = ensure_session_membership(db, actor, session_id)
+    actor, session = member
     if actor.role == "host":
-        remove_playlist_item(db, session, item_id)
-        db.refresh(session)
+        await run_db(remove_playlist_item, db, session, item_id)
         await broadcast_playlist(session)
         return {"status": "removed"}
-    request = create_request(db, session, actor, "remove", {"item_id": item_id})
+    request = await run_db(create_request, db, session, actor, "remove", {"item_id": item_id})
     await broadcast_request_update(request)
-    return build_request_model(request).model_dump()
+    return serialize_request(request)
 
 
 @app.post("/sessions/{session_id}/requests", response_model=PlaylistRequestModel)
 async def submit_custom_request(
     session_id: str,
     payload: CustomPlaylistRequest,
-    actor: User = Depends(get_actor),
+    member: tuple[User, CollabSession] = Depends(get_membership),
     db: Session = Depends(get_db),
 ) -> PlaylistRequestModel:
-    session = ensure_session_membership(db, actor, session_id)
-    request = create_request(db, session, actor, payload.request_type, payload.payload)
+    actor, session = member
+    request = await run_db(create_request, db, session, actor, payload.request_type, payload.payload)
     await broadcast_request_update(request)
     return build_request_model(request)
 
@@ -381,18 +809,22 @@ async def approve_request(
 ) -> PlaylistRequestModel:
     if actor.role != "host":
         raise HTTPException(status_code=403, detail="host privileges required")
-    request = db.get(PlaylistRequestEntry, request_id)
+    request = await run_db(get_request_entry, db, request_id)
     if not request:
         raise HTTPException(status_code=404, detail="request not found")
-    session = ensure_session(db, request.session_id)
+    session = await run_db(ensure_session, db, request.session_id, True)
     if session.host_id != actor.id:
         raise HTTPException(status_code=403, detail="wrong session")
-    apply_request(db, session, request)
-    request.status = "approved"
-    request.reason = resolution.reason
-    build_request_log(db, request, "approved", resolution.reason)
-    db.commit()
-    db.refresh(request)
+
+    def _resolve() -> None:
+        apply_request(db, session, request)
+        request.status = "approved"
+        request.reason = resolution.reason
+        build_request_log(db, request, "approved", resolution.reason)
+        db.commit()
+        db.refresh(request)
+
+    await run_db(_resolve)
     await broadcast_playlist(session)
     await broadcast_request_update(request)
     return build_request_model(request)
@@ -407,58 +839,74 @@ async def deny_request(
 ) -> PlaylistRequestModel:
     if actor.role != "host":
         raise HTTPException(status_code=403, detail="host privileges required")
-    request = db.get(PlaylistRequestEntry, request_id)
+    request = await run_db(get_request_entry, db, request_id)
     if not request:
         raise HTTPException(status_code=404, detail="request not found")
-    session = ensure_session(db, request.session_id)
+    session = await run_db(ensure_session, db, request.session_id)
     if session.host_id != actor.id:
         raise HTTPException(status_code=403, detail="wrong session")
-    request.status = "denied"
-    request.reason = resolution.reason
-    build_request_log(db, request, "denied", resolution.reason)
-    db.commit()
-    db.refresh(request)
-    await broadcast_request_update(request)
-    return build_request_model(request)
 
+    def _resolve() -> None:
+        request.status = "denied"
+        request.reason = resolution.reason
+        build_request_log(db, request, "denied", resolution.reason)
+        db.commit()
+        db.refresh(request)
 
-def update_playback_state(session: CollabSession, state_update: Dict) -> None:
-    if "track_id" in state_update:
-        session.playback_track_id = state_update["track_id"]
-    if "position_ms" in state_update:
-        session.playback_position_ms = state_update["position_ms"]
-    if "state" in state_update:
-        session.playback_state = state_update["state"]
-    session.playback_updated_at = datetime.now(timezone.utc)
+    await run_db(_resolve)
+    await broadcast_request_update(request)
+    return build_request_model(request)
 
 
-@app.post("/sessions/{session_id}/playback", response_model=Dict)
+@app.post("/sessions/{session_id}/playback")
 async def update_playback(
     session_id: str,
     state_update: Dict,
-    actor: User = Depends(get_actor),
+    member: tuple[User, CollabSession] = Depends(get_membership),
     db: Session = Depends(get_db),
 ):
-    session = ensure_session_membership(db, actor, session_id)
+    actor, session = member
     if actor.role != "host":
         raise HTTPException(status_code=403, detail="host privileges required")
-    update_playback_state(session, state_update)
-    db.commit()
-    await broadcast_playback(session)
-    return serialize_playback(session)
+    # A WS command scheduled within the debounce window would flush after
+    # this direct write and silently revert it; fold the pending update in
+    # (the HTTP body wins on conflicts) and drop it so the delayed flush
+    # becomes a no-op.
+    pending = playback_coalescer.pending.pop(session.id, None)
+    if pending:
+        state_update = {**pending, **state_update}
+    payload = await run_db(persist_playback_state, db, session.id, state_update)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="session not found")
+    await manager.broadcast_bytes(session.id, playback_envelope(payload))
+    return payload
+
+
+# Inbound frame types the socket accepts; anything else is rejected before
+# any handler work.
+ALLOWED_MSG_TYPES = frozenset(
+    {"playback_command", "request_playlist_change", "approve_request", "deny_request", "sync_ack"}
+)
 
 
 async def handle_websocket_message(
     db: Session,
     session: CollabSession,
-    actor: User,
-    envelope: MessageEnvelope,
+    actor_id: str,
+    actor_role: str,
+    msg_type: str,
+    payload: Dict,
 ) -> None:
-    if envelope.type == "playback_command":
-        if actor.role != "host":
+    if msg_type == "playback_command":
+        if actor_role != "host":
             raise HTTPException(status_code=403, detail="host privileges required")
-        command = PlaybackCommand(**envelope.payload)
+        command = PlaybackCommand(**payload)
         state_update: Dict[str, Optional[str]] = {}
+        # A write scheduled earlier in the current debounce window is the
+        # effective state even though it has not hit the DB yet; overlay it
+        # so back-to-back commands (e.g. two skips within 100ms) do not both
+        # compute from the same stale row.
+        pending = playback_coalescer.pending.get(session.id, {})
         if command.action in {"play", "seek"} and command.track_id:
             state_update["track_id"] = command.track_id
         if command.position_ms is not None:
@@ -468,99 +916,112 @@ async def handle_websocket_message(
         elif command.action == "pause":
             state_update["state"] = "paused"
         elif command.action == "seek":
-            state_update["state"] = session.playback_state
+            state_update["state"] = pending.get("state", session.playback_state)
         elif command.action in {"skip_next", "skip_prev"}:
-            items = sorted(session.playlist_items, key=lambda entry: entry.position)
-            if session.playback_track_id and items:
-                try:
-                    index = next(
-                        idx for idx, entry in enumerate(items) if entry.track_id == session.playback_track_id
-                    )
-                except StopIteration:
-                    index = 0
-            else:
+            order = track_order(db, session)
+            current = pending.get("track_id", session.playback_track_id)
+            try:
+                index = order.index(current) if current is not None else 0
+            except ValueError:
                 index = 0
-            if command.action == "skip_next" and items:
-                index = min(index + 1, len(items) - 1)
-            elif command.action == "skip_prev" and items:
-                index = max(index - 1, 0)
-            state_update["track_id"] = items[index].track_id if items else None
+            if order:
+                if command.action == "skip_next":
+                    index = min(index + 1, len(order) - 1)
+                else:
+                    index = max(index - 1, 0)
+            state_update["track_id"] = order[index] if order else None
             state_update["position_ms"] = 0
-            state_update["state"] = session.playback_state
-        update_playback_state(session, state_update)
-        db.commit()
-        await broadcast_playback(session)
-    elif envelope.type == "request_playlist_change":
-        if actor.role != "guest":
+            state_update["state"] = pending.get("state", session.playback_state)
+        playback_coalescer.schedule(session.id, state_update)
+    elif msg_type == "request_playlist_change":
+        if actor_role != "guest":
             raise HTTPException(status_code=403, detail="guest privileges required")
-        request = create_request(db, session, actor, envelope.payload["request_type"], envelope.payload["payload"])
+        actor = db.get(User, actor_id)
+        request = create_request(db, session, actor, payload["request_type"], payload["payload"])
         await broadcast_request_update(request)
-    elif envelope.type in {"approve_request", "deny_request"}:
-        if actor.role != "host":
+    elif msg_type in {"approve_request", "deny_request"}:
+        if actor_role != "host":
             raise HTTPException(status_code=403, detail="host privileges required")
-        request_id = envelope.payload.get("request_id")
-        request = db.get(PlaylistRequestEntry, request_id)
+        request_id = payload.get("request_id")
+        request = get_request_entry(db, request_id)
         if not request:
             raise HTTPException(status_code=404, detail="request not found")
-        if envelope.type == "approve_request":
+        if msg_type == "approve_request":
             apply_request(db, session, request)
             request.status = "approved"
         else:
             request.status = "denied"
-        request.reason = envelope.payload.get("reason")
+        request.reason = payload.get("reason")
         build_request_log(db, request, request.status, request.reason)
         db.commit()
         await broadcast_playlist(session)
         await broadcast_request_update(request)
-    elif envelope.type == "sync_ack":
-        pass
-    else:
-        raise HTTPException(status_code=400, detail="unsupported message type")
 
 
 @app.websocket("/ws/sessions/{session_id}")
 async def session_socket(websocket: WebSocket, session_id: str, token: str) -> None:
-    db = SessionLocal()
-    try:
-        actor = db.query(User).filter(User.token == token).one_or_none()
+    with SessionLocal() as db:
         session = db.get(CollabSession, session_id)
-        if not actor or not session:
+        info = lookup_token(db, token) if session is not None else None
+        if session is None or info is None:
             await websocket.close(code=4003)
             return
-        try:
-            ensure_session_membership(db, actor, session_id)
-        except HTTPException:
-            await websocket.close(code=4003)
-            return
-    finally:
-        db.close()
+        # Identity and role are fixed for the lifetime of the socket.
+        actor_id, actor_role, actor_session_id = info
+        is_member = (
+            session.host_id == actor_id
+            if actor_role == "host"
+            else actor_session_id == session_id
+        )
+        if not is_member:
+            # The cached tuple may predate joining; re-check against a fresh
+            # row before rejecting the handshake.
+            actor = select_user_by_token(db, token)
+            if actor is None:
+                await websocket.close(code=4003)
+                return
+            try:
+                ensure_session_membership(db, actor, session_id)
+            except HTTPException:
+                await websocket.close(code=4003)
+                return
+            _cache_token(token, actor, time.monotonic())
+            actor_id, actor_role = actor.id, actor.role
 
     await manager.connect(session_id, websocket)
+    # One session for the lifetime of the socket: db.get hits the identity
+    # map between messages instead of re-opening a session and re-selecting
+    # the row per inbound frame.
+    db = SessionLocal()
     try:
-        db = SessionLocal()
-        session = ensure_session(db, session_id)
-        await websocket.send_text(
-            json.dumps(MessageEnvelope(type="playback_state", payload=serialize_playback(session)).model_dump())
-        )
-        await websocket.send_text(
-            json.dumps(MessageEnvelope(type="playlist_update", payload={"playlist": serialize_playlist(session)}).model_dump())
-        )
-        db.close()
-        while True:
-            message = await websocket.receive_text()
-            envelope = MessageEnvelope(**json.loads(message))
-            db = SessionLocal()
-            session = ensure_session(db, session_id)
-            actor = db.query(User).filter(User.token == token).one()
-            await handle_websocket_message(db, session, actor, envelope)
-            db.close()
-    except WebSocketDisconnect:
-        await manager.disconnect(session_id, websocket)
+        session = ensure_session(db, session_id, load_playlist=True)
+        await websocket.send_bytes(playback_envelope(serialize_playback(session)))
+        await websocket.send_bytes(playlist_payload(session))
+        async for message in websocket.iter_text():
+            # A manual shape check is all the envelope needs; only
+            # PlaybackCommand keeps Pydantic validation because its fields
+            # are acted upon.
+            parsed = json_loads(message)
+            msg_type = parsed.get("type") if isinstance(parsed, dict) else None
+            if msg_type == "sync_ack":
+                continue
+            if msg_type not in ALLOWED_MSG_TYPES:
+                raise HTTPException(status_code=400, detail="unsupported message type")
+            payload = parsed.get("payload")
+            if not isinstance(payload, dict):
+                raise HTTPException(status_code=400, detail="payload must be an object")
+            session = db.get(CollabSession, session_id)
+            if session is None:
+                break
+            await handle_websocket_message(db, session, actor_id, actor_role, msg_type, payload)
+            # Release the implicit read transaction before blocking on the
+            # socket again; mutating branches have already committed.
+            db.rollback()
     finally:
-        try:
-            db.close()
-        except Exception:
-            pass
+        # iter_text returns (rather than raising) on client disconnect, so
+        # unregister unconditionally on the way out.
+        manager.forget(session_id, websocket)
+        db.close()
 
 
 if __name__ == "__main__":
@@ -1,16 +1,18 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from uuid import uuid4
+import secrets
+import time
 
-from sqlalchemy import JSON, Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import JSON, Column, DateTime, Float, ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy.orm import relationship
 
 from .database import Base
 
 
 def generate_id() -> str:
-    return uuid4().hex
+    # 96 bits of entropy in 16 url-safe chars, half the footprint of
+    # uuid4().hex in indexes and in every JSON payload carrying an id.
+    return secrets.token_urlsafe(12)
 
 
 class User(Base):
@@ -35,9 +37,10 @@ class CollabSession(Base):
     playback_track_id = Column(String, nullable=True)
     playback_position_ms = Column(Integer, default=0)
     playback_state = Column(String, default="paused")
-    playback_updated_at = Column(
-        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False
-    )
+    # Epoch seconds: cheaper to stamp per playback frame than an aware
+    # datetime; formatted only at serialization boundaries.
+    playback_updated_at = Column(Float, default=time.time, nullable=False)
+    playlist_version = Column(Integer, default=0, nullable=False)
 
     host = relationship("User", foreign_keys=[host_id])
     participants = relationship("User", back_populates="session", foreign_keys="User.session_id")
@@ -57,9 +60,13 @@ class CollabSession(Base):
 
 class PlaylistItem(Base):
     __tablename__ = "playlist_items"
+    __table_args__ = (Index("ix_playlist_items_session_position", "session_id", "position"),)
 
     id = Column(String, primary_key=True, default=generate_id)
-    session_id = Column(String, ForeignKey("sessions.id"), nullable=False, index=True)
+    # The (session_id, position) composite index above already serves
+    # session_id-prefix lookups; a separate single-column index would only
+    # add write amplification.
+    session_id = Column(String, ForeignKey("sessions.id"), nullable=False)
     track_id = Column(String, nullable=False)
     title = Column(String, nullable=False)
     artist = Column(String, nullable=True)
@@ -81,7 +88,7 @@ class PlaylistRequestEntry(Base):
     payload = Column(JSON, nullable=False)
     status = Column(String, default="pending", nullable=False)
     reason = Column(Text, nullable=True)
-    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     session = relationship("CollabSession", back_populates="requests")
     requester = relationship("User")
@@ -94,6 +101,6 @@ class RequestLog(Base):
     request_id = Column(String, ForeignKey("playlist_requests.id"), nullable=False)
     status = Column(String, nullable=False)
     message = Column(Text, nullable=True)
-    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     request = relationship("PlaylistRequestEntry")
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-from datetime import datetime
 from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field
@@ -10,7 +9,9 @@ class PlaybackStateModel(BaseModel):
     track_id: Optional[str]
     position_ms: int = Field(ge=0)
     state: str
-    updated_at: datetime
+    # Always the ISO-8601 string the serializers emit; typing it as str keeps
+    # model_construct-built responses consistent with the wire format.
+    updated_at: str
 
 
 class PlaylistItemModel(BaseModel):
@@ -1,58 +1,92 @@
 from __future__ import annotations
 
-import secrets
+import time
+from os import urandom as _urandom
 from datetime import datetime, timezone
 from typing import Dict, List, Optional
 
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import lambda_stmt, select, update
+from sqlalchemy.orm import Session, joinedload, selectinload
 
-from .models import CollabSession, PlaylistItem, PlaylistRequestEntry, RequestLog, User
+from .models import CollabSession, PlaylistItem, PlaylistRequestEntry, RequestLog, User, generate_id
 from .schemas import (
     PlaybackStateModel,
+    PlaylistItemModel,
     PlaylistRequestModel,
     SessionResponse,
 )
 
+# Bound once: avoids the module attribute lookup on every playback
+# serialization.
+_UTC = timezone.utc
+
 
 def serialize_playlist(session: CollabSession) -> List[Dict]:
-    items = sorted(session.playlist_items, key=lambda item: item.position)
+    # The relationship is mapped with order_by=position; no re-sort needed.
     return [
         {
             "id": item.id,
             "track_id": item.track_id,
             "name": item.title,
-            "media_url": f"/static/{item.media_path.lstrip('/')}",
+            "media_url": f"/static/{item.media_path}",
             "media_type": item.media_type,
             "duration_seconds": item.duration_seconds,
             "position": item.position,
         }
-        for item in items
+        for item in session.playlist_items
     ]
 
 
 def serialize_playback(session: CollabSession) -> Dict:
+    # The ISO string is memoized on the instance keyed by the epoch value,
+    # so fan-outs between state changes skip re-formatting. The transient
+    # attribute lives outside the mapping and is never flushed.
+    stamp = session.playback_updated_at
+    cached = getattr(session, "_playback_iso", None)
+    if cached is None or cached[0] != stamp:
+        cached = (stamp, datetime.fromtimestamp(stamp, _UTC).isoformat())
+        session._playback_iso = cached
     return {
         "track_id": session.playback_track_id,
         "position_ms": session.playback_position_ms,
         "state": session.playback_state,
-        "updated_at": session.playback_updated_at.isoformat(),
+        "updated_at": cached[1],
     }
 
 
 def build_session_response(session: CollabSession, include_host_token: bool = False) -> SessionResponse:
-    return SessionResponse(
+    # All fields originate from validated ORM rows, so model_construct skips
+    # the validator pipeline (nested models included). The nested values must
+    # still match their annotations, or serialization falls back to warnings
+    # and duck typing.
+    return SessionResponse.model_construct(
         session_id=session.id,
         code=session.code,
         host_token=session.host.token if include_host_token else None,
         max_media_duration_seconds=session.max_media_duration_seconds,
-        playlist=serialize_playlist(session),
-        playback_state=PlaybackStateModel(**serialize_playback(session)),
+        playlist=[PlaylistItemModel.model_construct(**item) for item in serialize_playlist(session)],
+        playback_state=PlaybackStateModel.model_construct(**serialize_playback(session)),
     )
 
 
+def serialize_request(request: PlaylistRequestEntry) -> Dict:
+    # Broadcast envelopes are server-built; skip the Pydantic model walk and
+    # emit the dict orjson will encode directly.
+    return {
+        "id": request.id,
+        "session_id": request.session_id,
+        "requester": request.requester.name,
+        "request_type": request.request_type,
+        "payload": request.payload,
+        "status": request.status,
+        "reason": request.reason,
+    }
+
+
 def build_request_model(request: PlaylistRequestEntry) -> PlaylistRequestModel:
-    return PlaylistRequestModel(
+    # Same trust boundary as build_session_response: DB-sourced fields only.
+    return PlaylistRequestModel.model_construct(
         id=request.id,
         session_id=request.session_id,
         requester=request.requester.name,
@@ -63,13 +97,40 @@ def build_request_model(request: PlaylistRequestEntry) -> PlaylistRequestModel:
     )
 
 
-def ensure_session(db: Session, session_id: str) -> CollabSession:
-    session = db.get(CollabSession, session_id)
+def ensure_session(db: Session, session_id: str, load_playlist: bool = False) -> CollabSession:
+    if load_playlist:
+        # Callers that go on to serialize the playlist fetch it up front
+        # instead of triggering a lazy load mid-handler. lambda_stmt caches
+        # the constructed statement across calls; only session_id is bound
+        # per execution.
+        stmt = lambda_stmt(
+            lambda: select(CollabSession)
+            .options(selectinload(CollabSession.playlist_items))
+            .where(CollabSession.id == session_id)
+        )
+        session = db.execute(stmt).scalar_one_or_none()
+    else:
+        session = db.get(CollabSession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="session not found")
     return session
 
 
+def get_request_entry(db: Session, request_id: Optional[str]) -> Optional[PlaylistRequestEntry]:
+    """Load a request together with its requester in one round trip.
+
+    serialize_request and build_request_model read requester.name, which
+    would otherwise lazy-load per entry."""
+    if request_id is None:
+        return None
+    stmt = lambda_stmt(
+        lambda: select(PlaylistRequestEntry)
+        .options(joinedload(PlaylistRequestEntry.requester))
+        .where(PlaylistRequestEntry.id == request_id)
+    )
+    return db.execute(stmt).scalar_one_or_none()
+
+
 def ensure_session_membership(db: Session, actor: User, session_id: str) -> CollabSession:
     session = ensure_session(db, session_id)
     if actor.role == "host" and session.host_id == actor.id:
@@ -79,16 +140,22 @@ def ensure_session_membership(db: Session, actor: User, session_id: str) -> Coll
     raise HTTPException(status_code=403, detail="not a member of this session")
 
 
-def generate_code(db: Session) -> str:
-    while True:
-        code = secrets.token_hex(3).upper()
-        existing = db.query(CollabSession).filter(CollabSession.code == code).one_or_none()
-        if not existing:
-            return code
+def generate_code() -> str:
+    # No uniqueness pre-SELECT: the unique constraint on sessions.code is
+    # authoritative and the caller retries on the (about 1 in 16 million)
+    # collision instead of paying a query per creation.
+    return _urandom(3).hex().upper()
 
 
 def create_token() -> str:
-    return secrets.token_hex(16)
+    # Same CSPRNG as secrets.token_hex with fewer Python layers per call.
+    return _urandom(16).hex()
+
+
+def bump_playlist_version(session: CollabSession) -> None:
+    # Broadcast caching keys serialized playlists on this counter; every
+    # playlist mutation must bump it before committing.
+    session.playlist_version = (session.playlist_version or 0) + 1
 
 
 def add_playlist_item(
@@ -105,22 +172,30 @@ def add_playlist_item(
         session_id=session.id,
         track_id=track_id,
         title=name,
-        media_path=media_path,
+        # Normalized once at write time so serializers can join the static
+        # URL without a per-row lstrip.
+        media_path=media_path.lstrip("/"),
         media_type=media_type,
         duration_seconds=duration_seconds,
         position=position,
     )
-    db.add(item)
+    # Appending to the relationship (rather than db.add) keeps the loaded
+    # collection current: with expire_on_commit=False nothing reloads it
+    # after commit, and the save-update cascade persists the row.
+    session.playlist_items.append(item)
     if session.playback_track_id is None:
         session.playback_track_id = track_id
+    bump_playlist_version(session)
+    # Flush populates the Python-side id default; nothing else can differ
+    # from what was just assigned, so the two post-commit refresh SELECTs
+    # were pure overhead.
+    db.flush()
     db.commit()
-    db.refresh(session)
-    db.refresh(item)
     return item
 
 
 def reorder_playlist(db: Session, session: CollabSession, item_id: str, new_position: int) -> None:
-    items = sorted(session.playlist_items, key=lambda entry: entry.position)
+    items = list(session.playlist_items)
     if new_position < 0 or new_position >= len(items):
         raise HTTPException(status_code=400, detail="new position out of range")
     try:
@@ -129,8 +204,19 @@ def reorder_playlist(db: Session, session: CollabSession, item_id: str, new_posi
         raise HTTPException(status_code=404, detail="item not found") from exc
     items.remove(item)
     items.insert(new_position, item)
-    for index, entry in enumerate(items):
-        entry.position = index
+    # One executemany UPDATE for the rows whose position actually moved,
+    # instead of marking every instance dirty for the flush.
+    mappings = [
+        {"id": entry.id, "position": index}
+        for index, entry in enumerate(items)
+        if entry.position != index
+    ]
+    if mappings:
+        db.bulk_update_mappings(PlaylistItem, mappings)
+        # The bulk path writes around the instances, so their positions (and
+        # the collection's order_by ordering) are stale; reload on next use.
+        db.expire(session, ["playlist_items"])
+    bump_playlist_version(session)
     db.commit()
 
 
@@ -138,33 +224,59 @@ def remove_playlist_item(db: Session, session: CollabSession, item_id: str) -> N
     item = db.get(PlaylistItem, item_id)
     if not item or item.session_id != session.id:
         raise HTTPException(status_code=404, detail="item not found")
+    removed_position = item.position
     db.delete(item)
-    remaining = [entry for entry in session.playlist_items if entry.id != item_id]
-    for index, entry in enumerate(sorted(remaining, key=lambda entry: entry.position)):
-        entry.position = index
+    # Positions are contiguous, so only entries past the removed slot move
+    # (down by one): a single pass over the ordered collection collects
+    # those shifts and the playback fallback, with no filter/sort passes.
+    fallback_track_id = None
+    mappings = []
+    for entry in session.playlist_items:
+        if entry.id == item_id:
+            continue
+        if fallback_track_id is None:
+            fallback_track_id = entry.track_id
+        if entry.position > removed_position:
+            mappings.append({"id": entry.id, "position": entry.position - 1})
+    if mappings:
+        db.bulk_update_mappings(PlaylistItem, mappings)
     if session.playback_track_id == item.track_id:
-        session.playback_track_id = remaining[0].track_id if remaining else None
+        session.playback_track_id = fallback_track_id
+    bump_playlist_version(session)
+    # Bulk updates and the delete both leave the loaded collection behind
+    # the database; mark it for reload rather than trusting it post-commit.
+    db.expire(session, ["playlist_items"])
     db.commit()
 
 
+def _apply_add(db: Session, session: CollabSession, payload: Dict) -> None:
+    add_playlist_item(
+        db,
+        session,
+        payload["track_id"],
+        payload["name"],
+        payload["media_path"],
+        payload["media_type"],
+        payload.get("duration_seconds"),
+    )
+
+
+def _apply_reorder(db: Session, session: CollabSession, payload: Dict) -> None:
+    reorder_playlist(db, session, payload["item_id"], payload["new_position"])
+
+
+def _apply_remove(db: Session, session: CollabSession, payload: Dict) -> None:
+    remove_playlist_item(db, session, payload["item_id"])
+
+
+_APPLY = {"add": _apply_add, "reorder": _apply_reorder, "remove": _apply_remove}
+
+
 def apply_request(db: Session, session: CollabSession, request: PlaylistRequestEntry) -> None:
-    payload = request.payload
-    if request.request_type == "add":
-        add_playlist_item(
-            db,
-            session,
-            payload["track_id"],
-            payload["name"],
-            payload["media_path"],
-            payload["media_type"],
-            payload.get("duration_seconds"),
-        )
-    elif request.request_type == "reorder":
-        reorder_playlist(db, session, payload["item_id"], payload["new_position"])
-    elif request.request_type == "remove":
-        remove_playlist_item(db, session, payload["item_id"])
-    else:
+    handler = _APPLY.get(request.request_type)
+    if handler is None:
         raise HTTPException(status_code=400, detail="unknown request type")
+    handler(db, session, request.payload)
 
 
 def log_request_event(db: Session, entry: PlaylistRequestEntry, status: str, message: str | None = None) -> None:
@@ -178,17 +290,18 @@ def create_request(
     request_type: str,
     payload: Dict,
 ) -> PlaylistRequestEntry:
+    # Assigning the id client-side lets the entry and its log row go out in
+    # a single flush, with no intermediate round trip and no post-commit
+    # refresh: every column is already known here.
     entry = PlaylistRequestEntry(
+        id=generate_id(),
         session_id=session.id,
         requester_id=actor.id,
         request_type=request_type,
         payload=payload,
     )
-    db.add(entry)
-    db.flush()
-    log_request_event(db, entry, "pending", "submitted")
+    db.add_all([entry, RequestLog(request_id=entry.id, status="pending", message="submitted")])
     db.commit()
-    db.refresh(entry)
     return entry
 
 
@@ -196,11 +309,37 @@ def build_request_log(db: Session, request: PlaylistRequestEntry, status: str, r
     log_request_event(db, request, status, reason)
 
 
-def update_playback_state(session: CollabSession, state_update: Dict) -> None:
+def persist_playback_state(db: Session, session_id: str, state_update: Dict) -> Optional[Dict]:
+    """Write the playback columns with one UPDATE ... RETURNING.
+
+    Skips the unit-of-work flush and the post-commit attribute reload; the
+    returned dict is the serialized playback state ready to broadcast.
+    Returns None if the session row no longer exists."""
+    values: Dict = {"playback_updated_at": time.time()}
     if "track_id" in state_update:
-        session.playback_track_id = state_update["track_id"]
+        values["playback_track_id"] = state_update["track_id"]
     if "position_ms" in state_update:
-        session.playback_position_ms = state_update["position_ms"]
+        values["playback_position_ms"] = state_update["position_ms"]
     if "state" in state_update:
-        session.playback_state = state_update["state"]
-    session.playback_updated_at = datetime.now(timezone.utc)
+        values["playback_state"] = state_update["state"]
+    row = db.execute(
+        update(CollabSession)
+        .where(CollabSession.id == session_id)
+        .values(**values)
+        .returning(
+            CollabSession.playback_track_id,
+            CollabSession.playback_position_ms,
+            CollabSession.playback_state,
+            CollabSession.playback_updated_at,
+        )
+    ).first()
+    if row is None:
+        db.rollback()
+        return None
+    db.commit()
+    return {
+        "track_id": row.playback_track_id,
+        "position_ms": row.playback_position_ms,
+        "state": row.playback_state,
+        "updated_at": datetime.fromtimestamp(row.playback_updated_at, _UTC).isoformat(),
+    }
@@ -4,10 +4,10 @@ import asyncio
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Dict, List, Optional
-from uuid import uuid4
+from uuid import uuid4 as _uuid4
 
 
-@dataclass
+@dataclass(slots=True)
 class PlaybackState:
     track_id: Optional[str] = None
     position_ms: int = 0
@@ -15,7 +15,7 @@ class PlaybackState:
     updated_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
 
 
-@dataclass
+@dataclass(slots=True)
 class PlaylistItem:
     id: str
     track_id: str
@@ -24,7 +24,7 @@ class PlaylistItem:
     position: int
 
 
-@dataclass
+@dataclass(slots=True)
 class PlaylistRequest:
     id: str
     session_id: str
@@ -35,7 +35,7 @@ class PlaylistRequest:
     reason: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Session:
     id: str
     code: str
@@ -43,10 +43,12 @@ class Session:
     host_token: str
     playback: PlaybackState = field(default_factory=PlaybackState)
     playlist: List[PlaylistItem] = field(default_factory=list)
+    # item id -> list index, so mutations find items without scanning.
+    playlist_index: Dict[str, int] = field(default_factory=dict)
     requests: List[str] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class Actor:
     token: str
     name: str
@@ -59,18 +61,19 @@ class State:
 
     def __init__(self) -> None:
         self.sessions: Dict[str, Session] = {}
+        self.sessions_by_code: Dict[str, Session] = {}
         self.tokens: Dict[str, Actor] = {}
         self.requests: Dict[str, PlaylistRequest] = {}
         self.lock = asyncio.Lock()
 
     def _generate_code(self) -> str:
-        return uuid4().hex[:6].upper()
+        return _uuid4().hex[:6].upper()
 
     def _generate_token(self) -> str:
-        return uuid4().hex
+        return _uuid4().hex
 
     def create_session(self, host_name: str) -> Session:
-        session_id = uuid4().hex
+        session_id = _uuid4().hex
         session = Session(
             id=session_id,
             code=self._generate_code(),
@@ -78,6 +81,7 @@ class State:
             host_token=self._generate_token(),
         )
         self.sessions[session_id] = session
+        self.sessions_by_code[session.code] = session
         self.tokens[session.host_token] = Actor(
             token=session.host_token,
             name=host_name,
@@ -98,10 +102,10 @@ class State:
         return self.sessions[session_id]
 
     def find_session_by_code(self, code: str) -> Session:
-        for session in self.sessions.values():
-            if session.code == code:
-                return session
-        raise KeyError("session not found")
+        session = self.sessions_by_code.get(code)
+        if session is None:
+            raise KeyError("session not found")
+        return session
 
     def get_actor(self, token: str) -> Actor:
         if token not in self.tokens:
@@ -110,37 +114,40 @@ class State:
 
     def add_playlist_item(self, session: Session, track_id: str, title: str, artist: str) -> PlaylistItem:
         item = PlaylistItem(
-            id=uuid4().hex,
+            id=_uuid4().hex,
             track_id=track_id,
             title=title,
             artist=artist,
             position=len(session.playlist),
         )
         session.playlist.append(item)
+        session.playlist_index[item.id] = item.position
         return item
 
+    @staticmethod
+    def _renumber(session: Session) -> None:
+        for idx, entry in enumerate(session.playlist):
+            entry.position = idx
+        session.playlist_index = {entry.id: idx for idx, entry in enumerate(session.playlist)}
+
     def reorder_playlist(self, session: Session, item_id: str, new_position: int) -> None:
         playlist = session.playlist
         if new_position < 0 or new_position >= len(playlist):
             raise ValueError("new position out of bounds")
-        for index, item in enumerate(playlist):
-            if item.id == item_id:
-                playlist.pop(index)
-                playlist.insert(new_position, item)
-                for idx, entry in enumerate(playlist):
-                    entry.position = idx
-                return
-        raise KeyError("item not found")
+        index = session.playlist_index.get(item_id)
+        if index is None:
+            raise KeyError("item not found")
+        item = playlist.pop(index)
+        playlist.insert(new_position, item)
+        self._renumber(session)
 
     def remove_playlist_item(self, session: Session, item_id: str) -> PlaylistItem:
-        playlist = session.playlist
-        for index, item in enumerate(playlist):
-            if item.id == item_id:
-                playlist.pop(index)
-                for idx, entry in enumerate(playlist):
-                    entry.position = idx
-                return item
-        raise KeyError("item not found")
+        index = session.playlist_index.get(item_id)
+        if index is None:
+            raise KeyError("item not found")
+        item = session.playlist.pop(index)
+        self._renumber(session)
+        return item
 
     def create_request(
         self,
@@ -150,7 +157,7 @@ class State:
         payload: Dict,
     ) -> PlaylistRequest:
         request = PlaylistRequest(
-            id=uuid4().hex,
+            id=_uuid4().hex,
             session_id=session.id,
             requester=requester.name,
             request_type=request_type,
@@ -171,6 +178,7 @@ class State:
     async def reset(self) -> None:
         async with self.lock:
             self.sessions.clear()
+            self.sessions_by_code.clear()
             self.tokens.clear()
             self.requests.clear()
 
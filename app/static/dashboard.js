@@ -13,6 +13,8 @@ const state = {
   maxDuration: null,
 };
 
+const textDecoder = new TextDecoder();
+
 const tokenDisplay = document.getElementById("token-display");
 const roleDisplay = document.getElementById("role-display");
 const sessionDisplay = document.getElementById("session-id");
@@ -252,23 +254,6 @@ function handleMediaSelection(event) {
   };
 }
 
-function readFileAsBase64(file) {
-  return new Promise((resolve, reject) => {
-    const reader = new FileReader();
-    reader.onload = () => {
-      const result = reader.result;
-      if (typeof result === "string") {
-        const [, base64 = ""] = result.split(",");
-        resolve(base64);
-      } else {
-        reject(new Error("Unable to read file"));
-      }
-    };
-    reader.onerror = () => reject(reader.error || new Error("Unable to read file"));
-    reader.readAsDataURL(file);
-  });
-}
-
 function syncFieldsets() {
   document.getElementById("host-session").disabled = state.role !== "host";
   document.getElementById("guest-session").disabled = state.role !== "guest";
@@ -406,19 +391,13 @@ async function handleAddTrack(event) {
     return;
   }
   try {
-    const media = await readFileAsBase64(file);
-    const payload = {
-      track_id: formValues.get("track_id"),
-      name: formValues.get("name"),
-      duration_seconds: formValues.get("duration_seconds")
-        ? Number(formValues.get("duration_seconds"))
-        : undefined,
-      media: {
-        filename: file.name,
-        content_type: file.type,
-        data: media,
-      },
-    };
+    const payload = new FormData();
+    payload.set("track_id", formValues.get("track_id"));
+    payload.set("name", formValues.get("name"));
+    if (formValues.get("duration_seconds")) {
+      payload.set("duration_seconds", formValues.get("duration_seconds"));
+    }
+    payload.set("file", file, file.name);
     await apiFetch(`/sessions/${state.sessionId}/playlist`, { method: "POST", body: payload });
     setBanner("Track submitted.", "success");
     event.target.reset();
@@ -483,6 +462,7 @@ function connectWebSocket() {
   const protocol = window.location.protocol === "https:" ? "wss" : "ws";
   const url = `${protocol}://${window.location.host}/ws/sessions/${state.sessionId}?token=${state.token}`;
   const ws = new WebSocket(url);
+  ws.binaryType = "arraybuffer";
   state.websocket = ws;
   wsStatus.textContent = "Connecting";
   ws.addEventListener("open", () => {
@@ -498,7 +478,9 @@ function connectWebSocket() {
   });
   ws.addEventListener("message", (event) => {
     try {
-      const message = JSON.parse(event.data);
+      const raw =
+        event.data instanceof ArrayBuffer ? textDecoder.decode(event.data) : event.data;
+      const message = JSON.parse(raw);
       if (message.type === "playlist_update") {
         state.playlist = message.payload.playlist;
         renderPlaylist();
@@ -38,10 +38,24 @@ def setup_module(_):
     main_module.SessionLocal = TestingSessionLocal
 
 
+@pytest.fixture(scope="module")
+def client():
+    # One client for the whole module: app/router setup is paid once
+    # instead of per test.
+    return TestClient(app)
+
+
+# users<->sessions reference each other, which defeats the metadata
+# topological sort, so the child-first delete order is spelled out.
+CLEANUP_TABLES = ("request_logs", "playlist_requests", "playlist_items", "users", "sessions")
+
+
 @pytest.fixture(autouse=True)
 def clean_db():
-    Base.metadata.drop_all(bind=TEST_ENGINE)
-    Base.metadata.create_all(bind=TEST_ENGINE)
+    # Deleting rows is much cheaper than drop_all/create_all DDL per test.
+    with TEST_ENGINE.begin() as conn:
+        for name in CLEANUP_TABLES:
+            conn.execute(Base.metadata.tables[name].delete())
     yield
 
 
@@ -78,27 +92,17 @@ def upload_track(
     name: str,
     duration_seconds: int = 30,
 ) -> Dict:
-    payload = {
-        "track_id": track_id,
-        "name": name,
-        "duration_seconds": duration_seconds,
-        "media": {
-            "filename": f"{track_id}.mp3",
-            "content_type": "audio/mpeg",
-            "data": base64.b64encode(b"dummy-bytes").decode(),
-        },
-    }
     response = client.post(
         f"/sessions/{session_id}/playlist",
         headers={"X-User-Token": token},
-        json=payload,
+        data={"track_id": track_id, "name": name, "duration_seconds": str(duration_seconds)},
+        files={"file": (f"{track_id}.mp3", b"dummy-bytes", "audio/mpeg")},
     )
     assert response.status_code == 200
     return response.json()
 
 
-def test_guest_request_flow():
-    client = TestClient(app)
+def test_guest_request_flow(client):
     host = login_host(client)
     session = create_session(client, host["token"])
     guest = join_guest(client, session["code"])
@@ -135,8 +139,7 @@ def test_guest_request_flow():
     assert updated[0]["track_id"] == "t2"
 
 
-def test_playback_updates_and_custom_request():
-    client = TestClient(app)
+def test_playback_updates_and_custom_request(client):
     host = login_host(client)
     session = create_session(client, host["token"])
     guest = join_guest(client, session["code"])
@@ -172,8 +175,7 @@ def test_playback_updates_and_custom_request():
     assert denial.json()["status"] == "denied"
 
 
-def test_websocket_broadcast_flow():
-    client = TestClient(app)
+def test_websocket_broadcast_flow(client):
     host = login_host(client)
     session = create_session(client, host["token"])
     guest = join_guest(client, session["code"])
@@ -191,10 +193,10 @@ def test_websocket_broadcast_flow():
     ) as host_ws, client.websocket_connect(
         f"/ws/sessions/{session['session_id']}?token={guest['guest_token']}"
     ) as guest_ws:
-        host_state = host_ws.receive_json()
-        host_playlist = host_ws.receive_json()
-        guest_state = guest_ws.receive_json()
-        guest_playlist = guest_ws.receive_json()
+        host_state = host_ws.receive_json(mode="binary")
+        host_playlist = host_ws.receive_json(mode="binary")
+        guest_state = guest_ws.receive_json(mode="binary")
+        guest_playlist = guest_ws.receive_json(mode="binary")
 
         assert host_state["type"] == guest_state["type"] == "playback_state"
         assert host_playlist["type"] == guest_playlist["type"] == "playlist_update"
@@ -205,8 +207,8 @@ def test_websocket_broadcast_flow():
                 "payload": {"action": "play", "track_id": "track-1", "position_ms": 0},
             }
         )
-        guest_playback = guest_ws.receive_json()
-        host_playback = host_ws.receive_json()
+        guest_playback = guest_ws.receive_json(mode="binary")
+        host_playback = host_ws.receive_json(mode="binary")
         assert guest_playback["type"] == host_playback["type"] == "playback_state"
         assert guest_playback["payload"]["state"] == "playing"
 
@@ -219,14 +221,55 @@ def test_websocket_broadcast_flow():
                 },
             }
         )
-        guest_request = guest_ws.receive_json()
-        host_request = host_ws.receive_json()
+        guest_request = guest_ws.receive_json(mode="binary")
+        host_request = host_ws.receive_json(mode="binary")
         assert guest_request["type"] == host_request["type"] == "request_update"
         assert guest_request["payload"]["status"] == "pending"
 
 
-def test_upload_respects_duration_limit():
-    client = TestClient(app)
+def test_upload_respects_duration_limit(client):
+    host = login_host(client)
+    session = create_session(client, host["token"], max_duration=10)
+
+    response = client.post(
+        f"/sessions/{session['session_id']}/playlist",
+        headers={"X-User-Token": host["token"]},
+        data={"track_id": "long", "name": "Long Track", "duration_seconds": "45"},
+        files={"file": ("long.mp3", b"dummy", "audio/mpeg")},
+    )
+    assert response.status_code == 400
+
+
+def test_upload_size_limit_rejections(client, monkeypatch):
+    import app.main as main_module
+
+    host = login_host(client)
+    session = create_session(client, host["token"])
+    url = f"/sessions/{session['session_id']}/playlist"
+    headers = {"X-User-Token": host["token"]}
+
+    # Chunked transfer carries no Content-Length, which would bypass the cap.
+    chunked = client.post(
+        url,
+        headers={**headers, "Content-Type": "multipart/form-data; boundary=x"},
+        content=iter([b"x"]),
+    )
+    assert chunked.status_code == 411
+
+    malformed = client.post(url, headers={**headers, "Content-Length": "not-a-number"})
+    assert malformed.status_code == 400
+
+    monkeypatch.setattr(main_module, "MAX_UPLOAD_BYTES", 10)
+    oversize = client.post(
+        url,
+        headers=headers,
+        data={"track_id": "big", "name": "Big Track"},
+        files={"file": ("big.mp3", b"0123456789abcdef", "audio/mpeg")},
+    )
+    assert oversize.status_code == 413
+
+
+def test_base64_upload_fallback_respects_duration_limit(client):
     host = login_host(client)
     session = create_session(client, host["token"], max_duration=10)
 